@@ -0,0 +1,243 @@
+#! /usr/bin/env python3.5
+# -*- coding: utf-8 -*-
+
+# This file extracts results from Gaussian, ORCA, CP2K and SIESTA outputs
+# into a SQLite store, so they do not have to be grepped again.
+# File: parse.py
+# Author: Sergi Pérez Labernia, 2019.
+
+# Imports
+import os
+import sqlite3
+from argparse import ArgumentParser
+from multiprocessing import Pool, cpu_count
+from pathlib import Path
+
+# Global definitions
+database = 'results.db'
+extensions = ['.qfi', '.out', '.log']
+hartreeToEv = 27.211386245988
+columns = ['path', 'size', 'mtime', 'program', 'energy', 'converged', 'terminated', 'walltime']
+
+# First lines identifying each program
+signatures = {
+    'gaussian': ['Entering Gaussian System', 'Gaussian, Inc.'],
+    'orca': ['O   R   C   A'],
+    'cp2k': ['CP2K|'],
+    'siesta': ['Siesta Version', 'Welcome to SIESTA'],
+}
+
+# Arguments
+parser = ArgumentParser(description='parse.py extracts energies, convergence flags and timings from Gaussian, ORCA, CP2K and SIESTA outputs.')
+parser.add_argument('-d', '--database', default=database, help='SQLite file where results are stored. By default '+database)
+parser.add_argument('-j', '--jobs', type=int, default=cpu_count(), help='Number of parsing processes. By default all cores.')
+parser.add_argument('-e', '--extension', action='append', help='Output extension to look for. Can be repeated. By default '+', '.join(extensions))
+parser.add_argument('-p', '--program', choices=sorted(signatures), help='Only show results of this program.')
+parser.add_argument('-s', '--show', action='store_true', help='Do not parse. Only show stored results.')
+parser.add_argument('paths', nargs='*', default=['.'], help='Output files or directories to scan recursively. By default the current one.')
+args = parser.parse_args()
+
+
+def parseDuration(words):
+    # '0 days 1 hours 2 minutes 3.4 seconds 5 msec' -> seconds
+    units = {'day': 86400, 'hour': 3600, 'minute': 60, 'second': 1, 'msec': 0.001}
+    seconds = 0.0
+
+    for value, unit in zip(words, words[1:]):
+        unit = unit.rstrip('.s') if unit != 'msec' else unit
+        if unit in units:
+            try:
+                seconds += float(value)*units[unit]
+            except ValueError:
+                pass
+
+    return seconds
+
+
+def lastFloat(line):
+    return float(line.split()[-1])
+
+
+def gaussianLine(line, result):
+    if 'SCF Done:' in line:
+        result['energy'] = float(line.split('=')[1].split()[0])
+        result['converged'] = 1
+    elif 'Stationary point found' in line:
+        result['converged'] = 1
+    elif 'Convergence failure' in line or 'Optimization stopped' in line:
+        result['converged'] = 0
+    elif 'Normal termination of Gaussian' in line:
+        result['terminated'] = 1
+    elif 'Elapsed time:' in line:
+        # One per Link1 step
+        result['walltime'] = (result['walltime'] or 0)+parseDuration(line.split(':', 1)[1].split())
+
+
+def orcaLine(line, result):
+    if 'FINAL SINGLE POINT ENERGY' in line:
+        result['energy'] = lastFloat(line)
+    elif 'SCF CONVERGED AFTER' in line or 'THE OPTIMIZATION HAS CONVERGED' in line:
+        result['converged'] = 1
+    elif 'SCF NOT CONVERGED' in line or 'The optimization did not converge' in line:
+        result['converged'] = 0
+    elif 'ORCA TERMINATED NORMALLY' in line:
+        result['terminated'] = 1
+    elif 'TOTAL RUN TIME:' in line:
+        result['walltime'] = parseDuration(line.split(':', 1)[1].split())
+
+
+def cp2kLine(line, result):
+    if 'ENERGY| Total FORCE_EVAL' in line:
+        result['energy'] = lastFloat(line)
+    elif 'SCF run converged' in line or 'GEOMETRY OPTIMIZATION COMPLETED' in line:
+        result['converged'] = 1
+    elif 'SCF run NOT converged' in line or 'MAXIMUM NUMBER OF OPTIMIZATION STEPS REACHED' in line:
+        result['converged'] = 0
+    elif 'PROGRAM ENDED AT' in line:
+        result['terminated'] = 1
+    elif line.startswith(' CP2K ') and len(line.split()) == 7:
+        # Timing report: CP2K  calls  asd  self-avg  self-max  total-avg  total-max
+        result['walltime'] = lastFloat(line)
+
+
+def siestaLine(line, result):
+    if 'siesta: E_KS(eV) =' in line:
+        result['energy'] = lastFloat(line)/hartreeToEv
+    elif 'SCF Convergence by' in line:
+        result['converged'] = 1
+    elif 'SCF_NOT_CONV' in line or 'SCF did not converge' in line:
+        result['converged'] = 0
+    elif 'Job completed' in line:
+        result['terminated'] = 1
+    elif 'Elapsed wall time (sec) =' in line:
+        result['walltime'] = lastFloat(line)
+
+
+handlers = {
+    'gaussian': gaussianLine,
+    'orca': orcaLine,
+    'cp2k': cp2kLine,
+    'siesta': siestaLine,
+}
+
+
+def parseFile(job):
+    # Reads the output once. Energies are stored in Hartree.
+    path, size, mtime = job
+    result = dict.fromkeys(columns)
+    result.update({'path': path, 'size': size, 'mtime': mtime, 'terminated': 0})
+    handler = None
+
+    try:
+        with open(path, 'r', errors='replace') as outputFile:
+            for line in outputFile:
+                if handler is None:
+                    for name, markers in signatures.items():
+                        if any(marker in line for marker in markers):
+                            result['program'] = name
+                            handler = handlers[name]
+                            break
+                    else:
+                        continue
+                try:
+                    handler(line, result)
+                except (ValueError, IndexError):
+                    pass
+    except OSError as error:
+        # Not stored, so it is tried again next time
+        print('ERROR: '+path+': '+error.strerror)
+        return None
+
+    return result
+
+
+def findFiles():
+    suffixes = args.extension or extensions
+
+    for name in args.paths:
+        path = Path(name)
+        if path.is_file():
+            yield path.resolve()
+        elif path.is_dir():
+            for root, dirs, files in os.walk(str(path)):
+                for file in files:
+                    if os.path.splitext(file)[1] in suffixes:
+                        yield Path(root, file).resolve()
+        else:
+            print('ERROR: '+name+" doesn't exists")
+
+
+def openDatabase():
+    connection = sqlite3.connect(args.database)
+    connection.execute('CREATE TABLE IF NOT EXISTS results (path TEXT PRIMARY KEY, size INTEGER, mtime REAL, program TEXT, '
+                       'energy REAL, converged INTEGER, terminated INTEGER, walltime REAL)')
+    connection.execute('CREATE INDEX IF NOT EXISTS results_program ON results (program)')
+
+    return connection
+
+
+def parseOutputs(connection):
+    known = {path: (size, mtime) for path, size, mtime in connection.execute('SELECT path, size, mtime FROM results')}
+    seen = set()
+    jobs = []
+
+    for path in findFiles():
+        try:
+            stat = path.stat()
+        except OSError:
+            # Dangling link or deleted during the scan
+            continue
+
+        seen.add(str(path))
+        if known.get(str(path)) != (stat.st_size, stat.st_mtime):
+            jobs.append((str(path), stat.st_size, stat.st_mtime))
+
+    # Outputs deleted from the scanned paths leave the store too. Other
+    # extensions were not scanned, so only these are checked.
+    suffixes = args.extension or extensions
+    roots = [str(Path(name).resolve()) for name in args.paths]
+    gone = [path for path in known if path not in seen and os.path.splitext(path)[1] in suffixes and not os.path.isfile(path)
+            and any(path == root or path.startswith(root.rstrip(os.sep)+os.sep) for root in roots)]
+
+    with connection:
+        connection.executemany('DELETE FROM results WHERE path = ?', ([path] for path in gone))
+
+    if jobs:
+        with Pool(max(1, args.jobs)) as pool:
+            results = pool.imap_unordered(parseFile, jobs, chunksize=max(1, min(64, len(jobs)//(4*max(1, args.jobs)))))
+            with connection:
+                connection.executemany('INSERT OR REPLACE INTO results VALUES ('+', '.join('?'*len(columns))+')',
+                                       ([result[column] for column in columns] for result in results if result is not None))
+
+    print(str(len(jobs))+' outputs parsed, '+str(len(seen)-len(jobs))+' unchanged, '+str(len(gone))+' removed in '+args.database+'\n')
+
+
+def showResults(connection):
+    query = 'SELECT path, program, energy, converged, terminated, walltime FROM results'
+    parameters = []
+
+    if args.program:
+        query += ' WHERE program = ?'
+        parameters.append(args.program)
+
+    for path, program, energy, converged, terminated, walltime in connection.execute(query+' ORDER BY path', parameters):
+        print('{:<10} {:>20} {:>3} {:>3} {:>10} {}'.format(
+            program or '-',
+            '-' if energy is None else '{:.10f}'.format(energy),
+            '-' if converged is None else converged,
+            terminated,
+            '-' if walltime is None else '{:.1f}'.format(walltime),
+            path))
+
+
+def main():
+    connection = openDatabase()
+    if not args.show:
+        parseOutputs(connection)
+    else:
+        showResults(connection)
+    connection.close()
+
+
+if __name__ == '__main__':
+    main()
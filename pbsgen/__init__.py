@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+
+# pbsgen generates and submits Torque/PBS job scripts for the kirk cluster.
+# The engine is pbsgen.engine, the programs are in pbsgen.backends.
+# File: pbsgen/__init__.py
+# Author: Sergi Pérez Labernia, 2019.
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+# Registry of the program backends. They are imported on demand, so a
+# generator only loads the one it needs.
+#
+# A backend module defines:
+#   program, title          module name prefix and name shown in the help
+#   versions, defaultVersion  -v choices mapped to module versions
+#   queues                  queues where the program is available
+#   suffix, outputDir       default output suffix, where the output is written
+#   memoryPerCore           GB per core requested by default, or None
+#   stageCopy               staged suffixes the program writes to
+#   arguments               extra (flags, options) for the parser
+#   environment, execution, results  template parts, same placeholders as
+#                           the engine template
+#   executable(args), context(args)  program line and extra placeholders
+#   validate(args, text)    error message for a wrong input, or None
+#   setNproc(text, nproc)   sets the cores in the input, or None
+#   setMemory(text, memory, nproc)  sets the memory in the input, or None
+#   readMemory(text)        GB the input asks for, or None
+#   truncateInput(text, nproc), probeCommand(args)  for --probe
+#   probeMarkers            output lines of a probe run that got through
+# File: pbsgen/backends/__init__.py
+# Author: Sergi Pérez Labernia, 2019.
+
+# Imports
+import importlib
+import sys
+
+# Global definitions
+backends = {
+    'gaussian': 'pbsgen.backends.gaussian',
+    'orca': 'pbsgen.backends.orca',
+    'cp2k': 'pbsgen.backends.cp2k',
+    'siesta': 'pbsgen.backends.siesta',
+}
+aliases = {
+    'g16': 'gaussian',
+}
+
+
+def loadBackend(name):
+    name = aliases.get(name, name)
+
+    if name not in backends:
+        print('ERROR: No backend for '+name+'. Available: '+', '.join(sorted(backends)))
+        sys.exit(1)
+
+    return importlib.import_module(backends[name])
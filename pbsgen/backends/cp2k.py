@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+# CP2K backend for pbsgen
+# File: pbsgen/backends/cp2k.py
+# Author: Sergi Pérez Labernia, 2017.
+
+# Imports
+from pathlib import Path
+from pbsgen import probe
+
+# Global definitions
+program = 'cp2k'
+title = 'cp2k'
+versions = {'6.1': '6.1', '4.1': '4.1'}
+defaultVersion = '6.1'
+queues = ['borg2', 'borg3', 'borg-test']
+suffix = '.out'
+outputDir = '$SWAP_DIR'
+memoryPerCore = None
+stageCopy = []
+probeMarkers = ['PROGRAM ENDED AT']
+arguments = [
+    (['-m', '--multinode'], {'action': 'store_true', 'help': 'Available.'}),
+]
+
+environment = ''
+
+execution = """{executable} -i {input} -o {output}"""
+
+results = """cp -a $SWAP_DIR $PBS_O_WORKDIR/{input}.$JOB_ID"""
+
+
+def executable(args):
+    if args.nproc == 1:
+        return program+'.popt'
+
+    # borg2 nodes have InfiniBand
+    if args.queue == 'borg2':
+        return 'mpirun -np '+str(args.nproc)+' -mca blt openib,self '+program+'.popt'
+
+    return 'mpirun -np '+str(args.nproc)+' -mca blt self '+program+'.popt'
+
+
+def context(args):
+    return {}
+
+
+def validate(args, text):
+    return None
+
+
+setNproc = None
+setMemory = None
+readMemory = None
+
+
+def truncateInput(text, nproc):
+    # A few MD steps or optimisation cycles. CP2K rejects repeated keywords,
+    # so existing ones in those sections are dropped.
+    limits = {'MD': 'STEPS', 'GEO_OPT': 'MAX_ITER', 'CELL_OPT': 'MAX_ITER'}
+    sections = []
+    lines = []
+
+    for line in text.splitlines():
+        words = line.split()
+        key = words[0].upper() if words else ''
+
+        if key.startswith('&END'):
+            if sections:
+                sections.pop()
+
+        elif key.startswith('&'):
+            sections.append(key[1:])
+            if key[1:] in limits:
+                lines.append(line)
+                line = '  '+limits[key[1:]]+' '+str(probe.probeCycles)
+
+        elif sections and sections[-1] in limits and key == limits[sections[-1]]:
+            continue
+
+        lines.append(line)
+
+    return '\n'.join(lines)+'\n'
+
+
+def probeCommand(args):
+    return 'mpirun -np $NPROC -mca blt self '+program+'.popt -i '+Path(args.input).name+' -o $PROBE_DIR/$NPROC.out'
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+# Gaussian 16 backend for pbsgen
+# File: pbsgen/backends/gaussian.py
+# Author: Sergi Pérez Labernia, 2019.
+
+# Imports
+import math
+import re
+from pathlib import Path
+from pbsgen import probe
+
+# Global definitions
+program = 'gaussian'
+title = 'Gaussian16'
+versions = {'16': '16-B.01'}
+defaultVersion = '16'
+queues = ['borg1', 'borg2', 'borg3', 'borg-test']
+suffix = '.qfi'
+outputDir = '$PBS_O_WORKDIR'
+memoryPerCore = None
+stageCopy = ['.chk']
+# The probe ends at the maxcycle limit or normally
+probeMarkers = ['Normal termination of Gaussian', 'Convergence failure']
+arguments = [
+    (['-c', '--chk'], {'action': 'store_true', 'help': 'Copy *.chk files to work dir.'}),
+]
+
+environment = """GAUSS_SCRDIR=$SWAP_DIR
+"""
+
+execution = """date > $PBS_O_WORKDIR/{output}
+cat $PBS_NODEFILE >> $PBS_O_WORKDIR/{output}
+{executable} < $SWAP_DIR/{input} >> $PBS_O_WORKDIR/{output} 2>&1"""
+
+results = """date >> $PBS_O_WORKDIR/{output}
+{copyChk}"""
+
+
+def executable(args):
+    return 'g16'
+
+
+def context(args):
+    if args.chk:
+        copyChk = 'cp -a $SWAP_DIR/*.chk $PBS_O_WORKDIR'
+    else:
+        copyChk = ''
+
+    return {'copyChk': copyChk}
+
+
+def validate(args, text):
+    # %nproc, %nprocs or %nprocshared must match -n
+    match = re.search(r'^\s*%nproc\w*\s*=\s*(\d+)', text, re.I | re.M)
+
+    if not match:
+        return 'No %nproc=n line in your input file. Add a line with this parameter where n is the number of cores.'
+
+    if int(match.group(1)) != args.nproc:
+        return 'You are asking for '+str(args.nproc)+' cores and you are setting '+match.group(0).strip()+' in your input file. These values do not match.'
+
+    return None
+
+
+def setNproc(text, nproc):
+    if re.search(r'^\s*%nproc', text, re.I | re.M):
+        return re.sub(r'^(\s*)%nproc\w*\s*=\s*\d+', r'\g<1>%nproc='+str(nproc), text, flags=re.I | re.M)
+
+    return '%nproc='+str(nproc)+'\n'+text
+
+
+def limitScf(route):
+    cycles = 'maxcycle='+str(probe.probeCycles)
+    route = re.sub(r',?\s*\bmaxcycle=\d+', '', route, flags=re.I)
+    route = re.sub(r'\(\s*,', '(', route)
+
+    match = re.search(r'\bscf\s*=?\s*\(\s*', route, re.I)
+    if match:
+        if route[match.end():].startswith(')'):
+            return route[:match.end()]+cycles+route[match.end():]
+        return route[:match.end()]+cycles+','+route[match.end():]
+
+    match = re.search(r'\bscf\s*=\s*(\w+)', route, re.I)
+    if match:
+        return route[:match.start()]+'scf=('+cycles+','+match.group(1)+')'+route[match.end():]
+
+    return route+' scf=('+cycles+')'
+
+
+def truncateInput(text, nproc):
+    # First Link1 step only, without %chk so the real checkpoint is not
+    # touched, and a few SCF cycles
+    lines = []
+    route = False
+
+    for line in setNproc(text.split('--Link1--')[0], nproc).splitlines():
+        if re.match(r'\s*%(old)?chk', line, re.I):
+            continue
+
+        if not route and line.lstrip().startswith('#'):
+            route = True
+            line = limitScf(line)
+
+        lines.append(line)
+
+    return '\n'.join(lines)+'\n'
+
+
+def readMemory(text):
+    # %mem without a unit is in 8-byte words
+    match = re.search(r'^\s*%mem\s*=\s*(\d+)\s*([KMGT]?)([BW]?)', text, re.I | re.M)
+
+    if not match:
+        return None
+
+    scale = {'': 1, 'K': 2**10, 'M': 2**20, 'G': 2**30, 'T': 2**40}[match.group(2).upper()]
+    if match.group(3).upper() != 'B':
+        scale *= 8
+
+    return max(1, int(math.ceil(int(match.group(1))*scale/2**30)))
+
+
+def setMemory(text, memory, nproc):
+    # %mem leaves some room below the PBS limit for g16 itself
+    line = '%mem='+str(int(memory*1024*0.9))+'MB'
+
+    if re.search(r'^\s*%mem\s*=', text, re.I | re.M):
+        return re.sub(r'^(\s*)%mem\s*=\s*\S+', lambda match: match.group(1)+line, text, flags=re.I | re.M)
+
+    return line+'\n'+text
+
+
+def probeCommand(args):
+    return 'GAUSS_SCRDIR=$SWAP_DIR\n'+executable(args)+' < $SWAP_DIR/'+Path(args.input).name+' > $PROBE_DIR/$NPROC.out 2>&1'
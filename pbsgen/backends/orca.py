@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+# ORCA backend for pbsgen
+# File: pbsgen/backends/orca.py
+# Author: Sergi Pérez Labernia, 2018.
+
+# Imports
+import re
+from pathlib import Path
+from pbsgen import probe
+
+# Global definitions
+program = 'orca'
+title = 'ORCA'
+versions = {'4.0.0': '4.0.0', '4.1.2': '4.1.2', '4.2.1': '4.2.1'}
+defaultVersion = '4.2.1'
+queues = ['borg1', 'borg2', 'borg3', 'borg-test']
+suffix = '.qfi'
+outputDir = '$PBS_O_WORKDIR'
+memoryPerCore = 4
+stageCopy = []
+# MaxIter stops the probe SCF unless it converges first
+probeMarkers = ['ORCA TERMINATED NORMALLY', 'SCF NOT CONVERGED']
+arguments = []
+
+environment = ''
+
+execution = """exec=`which {executable}`
+
+echo $SWAP_DIR > $PBS_O_WORKDIR/{output}
+echo "********" >> $PBS_O_WORKDIR/{output}
+cat $PBS_NODEFILE >> $PBS_O_WORKDIR/{output}
+echo "********" >> $PBS_O_WORKDIR/{output}
+$exec {input} >> $PBS_O_WORKDIR/{output}"""
+
+results = """cp $SWAP_DIR/*.gbw $PBS_O_WORKDIR/
+cp $SWAP_DIR/*.txt $PBS_O_WORKDIR/
+cp $SWAP_DIR/*.loc $PBS_O_WORKDIR/
+cp $SWAP_DIR/*.qro $PBS_O_WORKDIR/
+cp $SWAP_DIR/*.uno $PBS_O_WORKDIR/
+cp $SWAP_DIR/*.unso $PBS_O_WORKDIR/
+cp $SWAP_DIR/*.xyz $PBS_O_WORKDIR/
+cp $SWAP_DIR/*.prop $PBS_O_WORKDIR/"""
+
+
+def executable(args):
+    # ORCA runs its parallel parts itself and needs the full path, the
+    # template gets it with which
+    return program
+
+
+def context(args):
+    return {}
+
+
+def validate(args, text):
+    # PALn keyword or %pal nprocs n must match -n
+    if args.nproc == 1:
+        return None
+
+    match = re.search(r'^\s*!.*\bPAL(\d+)\b', text, re.I | re.M) or re.search(r'%pal\b.*?\bnprocs\s+(\d+)', text, re.I | re.S)
+
+    if not match:
+        return 'Add Opt PAL{0} or %pal nprocs {0} end in your input file. See Orca Job script page in wiki.qf.uab.cat'.format(args.nproc)
+
+    if int(match.group(1)) != args.nproc:
+        return 'You are asking for '+str(args.nproc)+' cores and your input file sets '+match.group(1)+'. These values do not match.'
+
+    return None
+
+
+def insertBlock(text, block):
+    # Blocks go before the coordinates
+    lines = text.splitlines(True)
+
+    for i, line in enumerate(lines):
+        if line.lstrip().startswith('*'):
+            return ''.join(lines[:i])+block+'\n'+''.join(lines[i:])
+
+    return text+'\n'+block+'\n'
+
+
+def setNproc(text, nproc):
+    text = re.sub(r'%pal\b.*?\bend\b[ \t]*\n?', '', text, flags=re.I | re.S)
+    lines = []
+
+    for line in text.splitlines(True):
+        if line.lstrip().startswith('!'):
+            line = re.sub(r'\s*\bPAL\d+\b', '', line, flags=re.I)
+        lines.append(line)
+
+    return insertBlock(''.join(lines), '%pal nprocs '+str(nproc)+' end')
+
+
+def truncateInput(text, nproc):
+    # A few SCF iterations
+    text = setNproc(text, nproc)
+    maxIter = 'MaxIter '+str(probe.probeCycles)
+
+    if re.search(r'%scf\b', text, re.I):
+        return re.sub(r'%scf\b(.*?)\bend\b', lambda match: '%scf '+maxIter+re.sub(r'\bmaxiter\s+\d+', '', match.group(1), flags=re.I)+'end', text, count=1, flags=re.I | re.S)
+
+    return insertBlock(text, '%scf '+maxIter+' end')
+
+
+def setMemory(text, memory, nproc):
+    # %maxcore is MB per core, and ORCA may go over it, so keep a margin
+    maxcore = '%maxcore '+str(int(memory*1024*0.75/nproc))
+
+    if re.search(r'^\s*%maxcore\b', text, re.I | re.M):
+        return re.sub(r'^(\s*)%maxcore\s+\d+', lambda match: match.group(1)+maxcore, text, flags=re.I | re.M)
+
+    return insertBlock(text, maxcore)
+
+
+readMemory = None
+
+
+def probeCommand(args):
+    return '`which '+executable(args)+'` '+Path(args.input).name+' > $PROBE_DIR/$NPROC.out'
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+# SIESTA backend for pbsgen
+# File: pbsgen/backends/siesta.py
+# Author: Sergi Pérez Labernia, 2019.
+
+# Imports
+from pathlib import Path
+from pbsgen import probe
+
+# Global definitions
+program = 'siesta'
+title = 'siesta'
+versions = {'4.1': '4.1-b4'}
+defaultVersion = '4.1'
+queues = ['borg2', 'borg3', 'borg-test']
+suffix = '.out'
+outputDir = '$SWAP_DIR'
+memoryPerCore = None
+stageCopy = []
+# SIESTA aborts at MaxSCFIterations unless SCF.MustConverge is off
+probeMarkers = ['Job completed', 'SCF did not converge', 'SCF_NOT_CONV']
+arguments = []
+
+environment = ''
+
+execution = """{executable} < $SWAP_DIR/{input} > $SWAP_DIR/{output}"""
+
+results = """cp -a $SWAP_DIR $PBS_O_WORKDIR/$JOB_ID"""
+
+
+def executable(args):
+    if args.nproc == 1:
+        return program
+
+    return 'mpirun -np '+str(args.nproc)+' '+program
+
+
+def context(args):
+    return {}
+
+
+def validate(args, text):
+    return None
+
+
+setNproc = None
+setMemory = None
+readMemory = None
+
+
+def truncateInput(text, nproc):
+    # A few SCF iterations. fdf labels ignore case, '.', '-' and '_'.
+    lines = []
+
+    for line in text.splitlines():
+        words = line.split()
+        label = words[0].lower().replace('.', '').replace('-', '').replace('_', '') if words else ''
+
+        if label in ['maxscfiterations', 'scfmaxiterations']:
+            continue
+
+        lines.append(line)
+
+    lines.append('MaxSCFIterations '+str(probe.probeCycles))
+
+    return '\n'.join(lines)+'\n'
+
+
+def probeCommand(args):
+    return 'mpirun -np $NPROC '+program+' < $SWAP_DIR/'+Path(args.input).name+' > $PROBE_DIR/$NPROC.out'
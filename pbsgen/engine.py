@@ -0,0 +1,387 @@
+# -*- coding: utf-8 -*-
+
+# Job script generator shared by every program. Queue limits, the template,
+# stage-in, probe and post-mortem live here; each program only defines its
+# backend in pbsgen/backends.
+# File: pbsgen/engine.py
+# Author: Sergi Pérez Labernia, 2019.
+
+# Imports
+import getpass
+import hashlib
+import os
+import shlex
+import sys
+from argparse import ArgumentParser, SUPPRESS
+from pathlib import Path
+from pbsgen import backends, postmortem, probe
+
+# Global definitions
+filename = 'script.pbs'
+qsub = '/usr/local/torque/bin/qsub'
+queues = ['borg1', 'borg2', 'borg3', 'borg-test']
+queueSeconds = {'borg1': 10800000, 'borg2': 21600000, 'borg3': None, 'borg-test': 129600}
+queueMinCores = {'borg2': 12}
+queueMaxCores = {'borg-test': 8}
+# os.getlogin() needs a terminal, batch jobs rerun this for resubmissions
+user = getpass.getuser()
+hostname = os.uname()[1]
+stageCacheDays = 7
+
+# Set by main()
+backend = None
+args = None
+
+
+def makeParser():
+    parser = ArgumentParser(description=os.path.basename(sys.argv[0])+' allows to summit '+backend.title+' jobs to the kirk cluster.')
+    parser.add_argument('-q', '--queue', choices=queues, required=True, help='Queue to submit to.')
+    parser.add_argument('-n', '--nproc', type=int, required=True, help='Number of processors.')
+    parser.add_argument('-v', '--version', choices=sorted(backend.versions), help='Version of the software you want to use.')
+    parser.add_argument('-s', '--noscr', action='store_true', help="Scratch won't be erased after 24 hours without writing.")
+    parser.add_argument('-w', '--walltime', type=int, help='Custom walltime in seconds. Borg1-max: 10800000, Borg-2 max: 21600000, Borg-3 max: -, Borg-test max: 129600')
+    if backend.memoryPerCore:
+        parser.add_argument(*memoryFlags(backend), type=int, help='Custom memory allocation in GB. By default '+str(backend.memoryPerCore)+'x nproc')
+    else:
+        parser.add_argument(*memoryFlags(backend), type=int, help='Custom memory allocation in GB.')
+    for flags, options in backend.arguments:
+        parser.add_argument(*flags, **options)
+    parser.add_argument('-f', '--stage', action='append', help='Auxiliary file to stage in through the node cache. Can be repeated.')
+    parser.add_argument('-P', '--probe', action='store_true', help='Time short truncated runs at several core counts on borg-test and recommend nproc, up to -n.')
+    parser.add_argument('-A', '--auto', action='store_true', help='With --probe, use the recommended nproc for this job once the timings are in.')
+    parser.add_argument('--scratch', type=int, help='Scratch space to request in GB.')
+    parser.add_argument('-R', '--retries', type=int, default=0, help='Automatic resubmissions with adjusted resources allowed if the job fails. See sweep.py.')
+    parser.add_argument('--attempt', type=int, default=0, help=SUPPRESS)
+    parser.add_argument('-N', '--nosub', action='store_true', help='Do not submit. Only crate script.pbs file.')
+    parser.add_argument('input', help='Input file name.')
+    parser.add_argument('output', help='Output file name.')
+
+    return parser
+
+
+def memoryFlags(module):
+    # Options taken by the backend keep their short flag
+    taken = [flag for flags, options in module.arguments for flag in flags]
+
+    return [flag for flag in ['-m', '--memory'] if flag not in taken]
+
+
+def queueAllows(queue, nproc):
+    return queueMinCores.get(queue, 1) <= nproc <= queueMaxCores.get(queue, nproc)
+
+
+def configureGeneral():
+    if args.nproc == 1:
+        pbsnodes = '\n#PBS -l nodes='+str(args.nproc)+':'+args.queue
+
+    else:
+        pbsnodes = '\n#PBS -l nodes=1:'+args.queue+':ppn='+str(args.nproc)
+
+    if args.memory:
+        memory = '\n#PBS -l mem='+str(args.memory)+'GB'
+
+    elif backend.memoryPerCore:
+        memory = '\n#PBS -l mem='+str(args.nproc*backend.memoryPerCore)+'GB'
+
+    else:
+        memory = ''
+
+    return pbsnodes, memory
+
+
+def configureScratch():
+    if args.noscr:
+        doNotDeleteScratch = 'touch NO_ESBORRAR_SCRATCH'
+
+    else:
+        doNotDeleteScratch = ''
+
+    if args.scratch:
+        scratch = '\n#PBS -l file='+str(args.scratch)+'gb'
+
+    else:
+        scratch = ''
+
+    return doNotDeleteScratch, scratch
+
+
+def configureQueue():
+    if args.queue not in backend.queues:
+        print('ERROR: Program not avaible in '+args.queue)
+        sys.exit(1)
+
+    if args.nproc < queueMinCores.get(args.queue, 1):
+        print('ERROR: No less than '+str(queueMinCores[args.queue])+' cores in '+args.queue)
+        sys.exit(1)
+
+    if args.nproc > queueMaxCores.get(args.queue, args.nproc):
+        print('ERROR: Maximum of '+str(queueMaxCores[args.queue])+' cores in '+args.queue)
+        sys.exit(1)
+
+    # Walltimes are core-seconds, divided among the cores
+    if args.walltime:
+        walltime = '\n#PBS -l walltime='+str(int(args.walltime/args.nproc))
+
+    elif queueSeconds[args.queue]:
+        walltime = '\n#PBS -l walltime='+str(int(queueSeconds[args.queue]/args.nproc))
+
+    else:
+        walltime = ''
+
+    return walltime
+
+
+def configureVersion():
+    version = backend.versions[args.version or backend.defaultVersion]
+    executable = backend.executable(args)
+
+    return version, executable
+
+
+def readInput():
+    if not os.path.isfile('./'+args.input):
+        print('ERROR: '+args.input+" doesn't exists or isn't a file\n")
+        sys.exit(1)
+
+    with open(args.input, 'r') as inputFile:
+        return inputFile.read()
+
+
+def configureFiles():
+    error = backend.validate(args, readInput())
+    if error:
+        print('ERROR: '+error+'\nPlease correct it.\n')
+        sys.exit(1)
+
+    if args.output == './':
+        output = Path(args.input).with_suffix(backend.suffix)
+
+    else:
+        output = args.output
+
+    return output
+
+
+def configureStageIn():
+    # Auxiliary files are copied once per node to a cache named by their
+    # sha256, checked again after the copy, and hard-linked into $SWAP_DIR.
+    # Suffixes in backend.stageCopy are written by the program, so they get
+    # a private copy from the cache.
+    if not args.stage:
+        return '', ''
+
+    # Entries no scratch directory links to are removed after stageCacheDays.
+    # The lock only saves duplicate copies, each job publishes with its own
+    # temporary name, so it is removed once the file is in the cache.
+    stageIn = """
+### STAGE-IN ###
+STAGE_CACHE=$(dirname $SWAP_DIR)/.stage-cache-$USER
+mkdir -p $STAGE_CACHE
+find $STAGE_CACHE -maxdepth 1 -type f -links 1 -mtime +"""+str(stageCacheDays)+""" -delete 2>/dev/null
+stagein() {
+    if [ ! -f $STAGE_CACHE/$1 ]; then
+        (
+            flock 9
+            if [ ! -f $STAGE_CACHE/$1 ]; then
+                cp "$2" $STAGE_CACHE/$1.$$
+                if [ "$(sha256sum < $STAGE_CACHE/$1.$$ | cut -d' ' -f1)" = $1 ]; then
+                    chmod a-w $STAGE_CACHE/$1.$$ && mv $STAGE_CACHE/$1.$$ $STAGE_CACHE/$1
+                else
+                    rm -f $STAGE_CACHE/$1.$$
+                fi
+            fi
+            rm -f $STAGE_CACHE/$1.lock
+        ) 9>$STAGE_CACHE/$1.lock
+    fi
+    if [ ! -f $STAGE_CACHE/$1 ]; then
+        echo "stagein: $2 changed since submission, copied without the cache" >&2
+        cp "$2" "$SWAP_DIR/$3"
+    elif [ $4 = copy ]; then
+        cp $STAGE_CACHE/$1 "$SWAP_DIR/$3" && chmod u+w "$SWAP_DIR/$3"
+    else
+        ln -f $STAGE_CACHE/$1 "$SWAP_DIR/$3" 2>/dev/null || cp $STAGE_CACHE/$1 "$SWAP_DIR/$3"
+    fi
+}
+"""
+    linked = []
+
+    for name in args.stage:
+        path = Path(name)
+        if not path.is_file():
+            print('ERROR: '+name+" doesn't exists or isn't a file")
+            sys.exit(1)
+
+        digest = hashlib.sha256()
+        with open(str(path), 'rb') as stageFile:
+            for block in iter(lambda: stageFile.read(1048576), b''):
+                digest.update(block)
+
+        if path.suffix in backend.stageCopy:
+            mode = 'copy'
+        else:
+            mode = 'link'
+            linked.append('"$SWAP_DIR"/'+shlex.quote(path.name))
+
+        stageIn += 'stagein '+digest.hexdigest()+' '+shlex.quote(str(path.resolve()))+' '+shlex.quote(path.name)+' '+mode+'\n'
+
+    # Linked files are not results, do not copy them back
+    if linked:
+        stageClean = 'rm -f '+' '.join(linked)+'\n'
+    else:
+        stageClean = ''
+
+    return stageIn, stageClean
+
+
+def configurePostMortem(output):
+    # Records how this job was generated so sweep.py can resubmit it
+    if args.memory:
+        memory = args.memory
+    elif backend.memoryPerCore:
+        memory = args.nproc*backend.memoryPerCore
+    elif backend.readMemory and backend.readMemory(readInput()):
+        memory = backend.readMemory(readInput())
+    else:
+        # No PBS limit, more memory is asked relative to a nominal allocation
+        memory = args.nproc*postmortem.defaultMemoryPerCore
+
+    # --probe --auto may have changed -n, record the one used
+    argv = postmortem.setOption([os.path.abspath(sys.argv[0])]+sys.argv[1:], ['-n', '--nproc'], args.nproc)
+    postmortem.writeRecord(argv, args.input, output, backend.outputDir, backend.program, args.queue, args.nproc, memory, args.scratch, args.retries, args.attempt)
+
+    return postmortem.postMortemBlock(args.input, backend.outputDir+'/'+str(output))
+
+
+def configureModule(version):
+    return backend.program+'/'+version
+
+
+def runProbe():
+    # Times a truncated input at several core counts on borg-test. Once all the
+    # timings are in, recommends nproc and with --auto uses it for this job.
+    text = readInput()
+    directory = Path(args.input+'.probe')
+    cores = probe.probeCores(args.nproc)
+    # A larger -n than last time needs more core counts
+    missing = [n for n in cores if not (directory / str(n)).is_dir()]
+
+    if missing:
+        version, executable = configureVersion()
+        stageIn, stageClean = configureStageIn()
+        script = probe.makeProbe(directory, args.input, text, missing, backend.truncateInput, user, configureModule(version), stageIn, backend.probeCommand(args))
+
+        if args.nosub == False:
+            os.system(qsub+' '+str(script))
+            print('Probe jobs for '+', '.join(str(n) for n in missing)+' cores sent to '+probe.probeQueue+'. Run again with --probe when they finish.\n')
+        else:
+            print(str(script)+' created.\n')
+        sys.exit(0)
+
+    timings, failed = probe.readTimings(directory, cores, backend.probeMarkers)
+    if failed:
+        print('ERROR: Probe runs failed at '+', '.join(str(n) for n in failed)+' cores, see the *.out files in '+str(directory)+'. Remove it and probe again.\n')
+        sys.exit(1)
+
+    if len(timings) < len(cores):
+        print(str(len(timings))+' of '+str(len(cores))+' probe timings in '+str(directory)+'. Run again when the probe jobs finish.\n')
+        sys.exit(0)
+
+    best = probe.recommendCores(timings, [n for n in range(1, args.nproc+1) if queueAllows(args.queue, n)])
+    if not args.auto:
+        sys.exit(0)
+
+    args.nproc = best
+    if backend.setNproc:
+        with open(args.input, 'w') as inputFile:
+            inputFile.write(backend.setNproc(text, best))
+        print(args.input+' set to '+str(best)+' cores.')
+
+
+def makeFile(pbsnodes, walltime, memory, module, doNotDeleteScratch, scratch, version, executable, output, stageIn, stageClean, postMortem):
+
+    template = """#PBS -q {queue}
+#PBS -N {input}
+#PBS -M {user}@klingon.uab.cat{pbsnodes}{walltime}{memory}{scratch}
+#PBS -k oe
+#PBS -r n
+
+### ENVIRONMENT ###
+. /QFcomm/environment.bash
+module load {module}
+{doNotDeleteScratch}{stageIn}{postMortem}{environment}
+### EXECUTION ###
+{execution}
+status=$?
+{stageClean}
+### RESULTS ###
+{results}
+postmortem $status
+"""
+
+    context = {
+        'queue': args.queue,
+        'user': user,
+        'nproc': args.nproc,
+        'input': args.input,
+        'output': output,
+        'pbsnodes': pbsnodes,
+        'walltime': walltime,
+        'memory': memory,
+        'scratch': scratch,
+        'module': module,
+        'doNotDeleteScratch': doNotDeleteScratch,
+        'version': version,
+        'program': backend.program,
+        'executable': executable,
+        'stageIn': stageIn,
+        'stageClean': stageClean,
+        'postMortem': postMortem,
+    }
+    context.update(backend.context(args))
+
+    # The backend parts use the same placeholders
+    for part in ['environment', 'execution', 'results']:
+        context[part] = getattr(backend, part).format(**context)
+
+    with open(filename, 'w') as file:
+        file.write(template.format(**context))
+
+
+def jobInformation(module):
+    print('')
+    print('--- Script information ---')
+    print('Hostname: '+hostname)
+    print('Username: '+user)
+    print('Modules: '+module)
+
+
+def submitJob():
+    if args.nosub == False:
+        # sweep.py resubmits through here and needs to know it failed
+        if os.system(qsub+' '+filename) != 0:
+            print('ERROR: '+qsub+' could not send '+filename+'\n')
+            sys.exit(1)
+        print('Job sent to '+args.queue+'\n')
+    else:
+        print(filename+' created.\n')
+
+
+def main(name):
+    global backend, args
+
+    backend = backends.loadBackend(name)
+    args = makeParser().parse_args()
+
+    if args.probe:
+        runProbe()
+    pbsnodes, memory = configureGeneral()
+    doNotDeleteScratch, scratch = configureScratch()
+    walltime = configureQueue()
+    version, executable = configureVersion()
+    output = configureFiles()
+    stageIn, stageClean = configureStageIn()
+    postMortem = configurePostMortem(output)
+    module = configureModule(version)
+    makeFile(pbsnodes, walltime, memory, module, doNotDeleteScratch, scratch, version, executable, output, stageIn, stageClean, postMortem)
+    jobInformation(module)
+    submitJob()
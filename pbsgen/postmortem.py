@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+
+# Shared helpers to classify how a job ended and to resubmit it with adjusted
+# resources. Used by the post-mortem step of the generated scripts and by
+# sweep.py.
+# File: pbsgen/postmortem.py
+# Author: Sergi Pérez Labernia, 2019.
+
+# Imports
+import json
+import math
+import os
+import subprocess
+import sys
+from pathlib import Path
+from pbsgen import backends
+
+# Global definitions
+qstat = '/usr/local/torque/bin/qstat'
+rulesFile = os.path.expanduser('~/.pbs-rules.json')
+tailBytes = 65536
+defaultScratch = 100
+defaultMemoryPerCore = 2
+
+# Markers in the output tail, the last matching line wins
+patterns = [
+    ('normal', ['Normal termination of Gaussian', 'ORCA TERMINATED NORMALLY', 'PROGRAM ENDED AT', 'Job completed']),
+    ('erroneous-write', ['Erroneous write']),
+    ('scratch', ['No space left on device', 'Disk quota exceeded']),
+    ('maxcore', ['Please increase MaxCore', 'increase %maxcore', 'Not enough memory available']),
+    ('memory', ['could not allocate memory', 'Cannot allocate memory', 'std::bad_alloc', 'Out of memory', 'oom-kill']),
+    ('walltime', ['job killed: walltime']),
+]
+
+# Torque statuses (negative) and program killed by SIGKILL. SIGTERM (271) also
+# comes from qdel, so it is a walltime kill only if Torque says so.
+exitStatuses = {-10: 'memory', -11: 'walltime', 137: 'memory'}
+sigterm = 271
+
+# How resources change for each failure. ~/.pbs-rules.json overrides them.
+rules = {
+    'walltime': {'queue': {'borg-test': 'borg1', 'borg1': 'borg2', 'borg2': 'borg3'}},
+    'memory': {'memory': 2.0},
+    'maxcore': {'memory': 1.5},
+    'scratch': {'scratch': 2.0},
+    'erroneous-write': {'scratch': 2.0},
+}
+
+
+def recordPath(input):
+    return Path(input+'.retry')
+
+
+def exitPath(record):
+    return Path(str(record)[:-len('.retry')]+'.exit')
+
+
+def writeRecord(argv, input, output, outputDir, program, queue, nproc, memory, scratch, retries, attempt):
+    # Everything needed to generate the job again with other resources
+    record = {
+        'argv': argv,
+        'cwd': os.getcwd(),
+        'input': input,
+        'output': str(output),
+        'outputDir': outputDir,
+        'program': program,
+        'queue': queue,
+        'nproc': nproc,
+        'memory': memory,
+        'scratch': scratch,
+        'retries': retries,
+        'attempt': attempt,
+    }
+
+    with open(str(recordPath(input)), 'w') as recordFile:
+        json.dump(record, recordFile, indent=1)
+
+    # A stale status would be taken for the new job
+    if exitPath(recordPath(input)).is_file():
+        exitPath(recordPath(input)).unlink()
+
+
+def postMortemBlock(input, output):
+    # The job writes its id at start, and its status plus the output tail at
+    # the end or when Torque sends SIGTERM, then lets sweep.py handle it
+    block = """
+### POST-MORTEM ###
+echo $PBS_JOBID > $PBS_O_WORKDIR/{input}.exit
+postmortem() {{
+    echo $PBS_JOBID $1 > $PBS_O_WORKDIR/{input}.exit
+    tail -c {tailBytes} {output} >> $PBS_O_WORKDIR/{input}.exit 2>/dev/null
+    {python} {sweep} --job $PBS_O_WORKDIR/{input}.retry
+}}
+trap 'postmortem {sigterm}; exit {sigterm}' TERM
+"""
+
+    return block.format(input=input, output=output, tailBytes=tailBytes, sigterm=sigterm, python=sys.executable,
+                        sweep=Path(__file__).resolve().parent.parent / 'sweep.py')
+
+
+def loadRules(path):
+    current = dict(rules)
+
+    if os.path.isfile(path):
+        with open(path, 'r') as file:
+            current.update(json.load(file))
+
+    return current
+
+
+def readTail(path):
+    try:
+        with open(str(path), 'rb') as file:
+            file.seek(0, os.SEEK_END)
+            file.seek(max(0, file.tell()-tailBytes))
+            return file.read().decode('utf-8', 'replace')
+    except OSError:
+        return ''
+
+
+def queryJob(jobid):
+    # (job_state, exit_status) from qstat, None when Torque forgot the job
+    try:
+        text = subprocess.check_output([qstat, '-f', jobid], stderr=subprocess.DEVNULL).decode('utf-8', 'replace')
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+    state = None
+    status = None
+    for line in text.splitlines():
+        if '=' in line:
+            key, value = [word.strip() for word in line.split('=', 1)]
+            if key == 'job_state':
+                state = value
+            elif key == 'exit_status':
+                status = int(value)
+
+    return state, status
+
+
+def classify(text, status):
+    found = None
+
+    for line in text.splitlines():
+        for name, markers in patterns:
+            if any(marker in line for marker in markers):
+                found = name
+
+    if found not in [None, 'normal']:
+        return found
+    if status in exitStatuses:
+        return exitStatuses[status]
+    # A failing status wins over the marker of an earlier Link1 step
+    if status not in [None, 0]:
+        return 'unknown'
+    if found == 'normal' or status == 0:
+        return 'normal'
+
+    return 'unknown'
+
+
+def findOption(argv, flags):
+    # Index and form of an option taking a value: '-x value', '--xxx=value'
+    # or '-xvalue'. Only pass flags that take a value.
+    for i, word in enumerate(argv[1:], 1):
+        if word in flags:
+            return i, 'next'
+        for flag in flags:
+            if flag.startswith('--') and word.startswith(flag+'='):
+                return i, 'equals'
+            if not flag.startswith('--') and word.startswith(flag) and not word.startswith('--'):
+                return i, 'attached'
+
+    return None, None
+
+
+def setOption(argv, flags, value):
+    # Replaces the value of the option, or appends it
+    argv = list(argv)
+    i, form = findOption(argv, flags)
+
+    if form == 'next' and i+1 < len(argv):
+        argv[i+1] = str(value)
+    elif form == 'equals':
+        argv[i] = argv[i].split('=', 1)[0]+'='+str(value)
+    elif form == 'attached':
+        argv[i] = argv[i][:2]+str(value)
+    else:
+        # Options go before the input and output positionals
+        argv = argv[:-2]+[flags[-1], str(value)]+argv[-2:]
+
+    return argv
+
+
+def dropOption(argv, flags):
+    # Removes an option taking a value, with its value
+    argv = list(argv)
+    i, form = findOption(argv, flags)
+
+    while i is not None:
+        del argv[i:i+2 if form == 'next' else i+1]
+        i, form = findOption(argv, flags)
+
+    return argv
+
+
+def dropFlags(argv, flags):
+    return [word for word in argv if word not in flags]
+
+
+def adjust(record, failure, currentRules):
+    # (argv, memory) for the resubmission, memory is None when unchanged.
+    # (None, None) when no rule applies.
+    from pbsgen import engine
+
+    rule = currentRules.get(failure)
+    if not rule:
+        return None, None
+
+    backend = backends.loadBackend(record['program'])
+    argv = dropFlags(record['argv'], ['-N', '--nosub', '-P', '--probe', '-A', '--auto'])
+    memory = None
+    changed = False
+
+    if 'queue' in rule:
+        # A custom walltime would carry over to the new queue
+        if findOption(argv, ['-w', '--walltime'])[0] is not None:
+            argv = dropOption(argv, ['-w', '--walltime'])
+            changed = True
+
+        # Follow the chain up to a queue that takes this program and nproc
+        queue = rule['queue'].get(record['queue'])
+        visited = [record['queue']]
+        while queue and queue not in visited and not (queue in backend.queues and engine.queueAllows(queue, record['nproc'])):
+            visited.append(queue)
+            queue = rule['queue'].get(queue)
+
+        if queue and queue not in visited:
+            argv = setOption(argv, ['-q', '--queue'], queue)
+            changed = True
+
+    if 'memory' in rule and record['memory']:
+        memory = int(math.ceil(record['memory']*rule['memory']))
+        argv = setOption(argv, engine.memoryFlags(backend), memory)
+        changed = True
+
+    if 'scratch' in rule:
+        argv = setOption(argv, ['--scratch'], int(math.ceil((record['scratch'] or defaultScratch)*rule['scratch'])))
+        changed = True
+
+    if not changed:
+        return None, None
+
+    return setOption(argv, ['--attempt'], record['attempt']+1), memory
+
+
+def setInputMemory(record, memory):
+    # %mem or %maxcore in the input must follow the new allocation
+    backend = backends.loadBackend(record['program'])
+    if not backend.setMemory:
+        return
+
+    path = Path(record['cwd'], record['input'])
+    with open(str(path), 'r') as inputFile:
+        text = inputFile.read()
+    with open(str(path), 'w') as inputFile:
+        inputFile.write(backend.setMemory(text, memory, record['nproc']))
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+# Shared helpers for the --probe mode of the job generators. A truncated
+# input is run at several core counts as an array job on borg-test and the
+# timings are fitted to choose nproc for the full run.
+# File: pbsgen/probe.py
+# Author: Sergi Pérez Labernia, 2019.
+
+# Imports
+import sys
+from pathlib import Path
+
+# Global definitions
+probeQueue = 'borg-test'
+probeMaxCores = 8
+probeWalltime = 3600
+probeEfficiency = 0.75
+probeCycles = 3
+
+
+def probeCores(nproc):
+    # 1, 2, 4, ... up to nproc or the borg-test limit
+    top = min(nproc, probeMaxCores)
+    cores = []
+    n = 1
+
+    while n < top:
+        cores.append(n)
+        n *= 2
+    cores.append(top)
+
+    return cores
+
+
+def makeProbe(directory, input, text, cores, truncate, user, module, stageIn, command):
+    # One truncated input per core count in directory/<n>/, and the array job
+    for n in cores:
+        (directory / str(n)).mkdir(parents=True, exist_ok=True)
+        with open(str(directory / str(n) / Path(input).name), 'w') as probeFile:
+            probeFile.write(truncate(text, n))
+
+    template = """#PBS -q {queue}
+#PBS -N {name}
+#PBS -M {user}@klingon.uab.cat
+#PBS -l nodes=1:{queue}:ppn={ppn}
+#PBS -l walltime={walltime}
+#PBS -t 0-{last}
+#PBS -k oe
+#PBS -r n
+
+### ENVIRONMENT ###
+. /QFcomm/environment.bash
+module load {module}
+{stageIn}
+### PROBE ###
+CORES=({cores})
+NPROC=${{CORES[$PBS_ARRAYID]}}
+PROBE_DIR=$PBS_O_WORKDIR/{directory}
+cp $PROBE_DIR/$NPROC/{input} $SWAP_DIR/{input}
+
+start=$(date +%s.%N)
+{command}
+status=$?
+end=$(date +%s.%N)
+echo $start $end $status > $PROBE_DIR/$NPROC.time
+"""
+
+    context = {
+        'queue': probeQueue,
+        'name': 'probe-'+Path(input).name,
+        'user': user,
+        'ppn': max(cores),
+        'walltime': probeWalltime,
+        'last': len(cores)-1,
+        'module': module,
+        'stageIn': stageIn,
+        'cores': ' '.join(str(n) for n in cores),
+        'directory': str(directory),
+        'input': Path(input).name,
+        'command': command,
+    }
+
+    script = directory / 'probe.pbs'
+    with open(str(script), 'w') as file:
+        file.write(template.format(**context))
+
+    return script
+
+
+def readTimings(directory, cores, markers):
+    # Timings of the runs that got through, and the core counts that did not.
+    # Truncated runs may stop with an error, so a marker in the output counts
+    # as well as a zero status.
+    timings = {}
+    failed = []
+
+    for n in cores:
+        path = directory / (str(n)+'.time')
+        if path.is_file():
+            with open(str(path), 'r') as timeFile:
+                words = timeFile.read().split()
+
+            try:
+                with open(str(directory / (str(n)+'.out')), 'r', errors='replace') as outputFile:
+                    text = outputFile.read()
+            except OSError:
+                text = ''
+
+            if words[2:] == ['0'] or any(marker in text for marker in markers):
+                timings[n] = float(words[1])-float(words[0])
+            else:
+                failed.append(n)
+
+    return timings, failed
+
+
+def fitAmdahl(timings):
+    # t(n) = serial + parallel/n, least squares in 1/n
+    points = [(1/n, t) for n, t in timings.items()]
+
+    if len(points) == 1:
+        return 0.0, points[0][1]/points[0][0]
+
+    meanX = sum(x for x, t in points)/len(points)
+    meanT = sum(t for x, t in points)/len(points)
+    variance = sum((x-meanX)**2 for x, t in points)
+    parallel = sum((x-meanX)*(t-meanT) for x, t in points)/variance
+    serial = meanT-parallel*meanX
+
+    return max(serial, 0.0), max(parallel, 0.0)
+
+
+def recommendCores(timings, candidates):
+    # Largest core count whose predicted parallel efficiency is still acceptable
+    if not candidates:
+        print('ERROR: No valid number of cores for the full run')
+        sys.exit(1)
+
+    serial, parallel = fitAmdahl(timings)
+    best = candidates[0]
+
+    if serial+parallel > 0:
+        for n in candidates:
+            if (serial+parallel)/(n*serial+parallel) >= probeEfficiency:
+                best = n
+
+    print('')
+    print('--- Probe timings ---')
+    for n in sorted(timings):
+        print('{:>4} cores: {:>10.1f} s'.format(n, timings[n]))
+    print('Serial fraction: {:.3f}'.format(serial/(serial+parallel) if serial+parallel > 0 else 1.0))
+    print('Recommended nproc: '+str(best)+' (efficiency >= '+str(probeEfficiency)+')\n')
+
+    return best
@@ -0,0 +1,140 @@
+#! /usr/bin/env python3.5
+# -*- coding: utf-8 -*-
+
+# This file classifies how the jobs created by the generators ended and
+# resubmits the failed ones with adjusted resources.
+# File: sweep.py
+# Author: Sergi Pérez Labernia, 2019.
+
+# Imports
+import json
+import os
+import subprocess
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+from pbsgen import postmortem
+
+# Arguments
+parser = ArgumentParser(description='sweep.py classifies finished jobs and resubmits the failed ones with adjusted resources.')
+parser.add_argument('-r', '--rules', default=postmortem.rulesFile, help='JSON file with resubmission rules. By default '+postmortem.rulesFile)
+parser.add_argument('-j', '--job', help='Handle only this *.retry record. Used by the post-mortem step of the jobs.')
+parser.add_argument('-N', '--nosub', action='store_true', help='Do not resubmit. Only show the classification.')
+parser.add_argument('paths', nargs='*', default=['.'], help='Directories to scan recursively for *.retry records. By default the current one.')
+args = parser.parse_args()
+
+
+def findRecords():
+    if args.job:
+        yield Path(args.job)
+        return
+
+    for name in args.paths:
+        for root, dirs, files in os.walk(name):
+            for file in files:
+                if file.endswith('.retry'):
+                    yield Path(root, file)
+
+
+def jobStatus(path):
+    # jobid, status and the output tail saved by the post-mortem step. The
+    # header line is read on its own, the tail alone can be 64 KB.
+    with open(str(postmortem.exitPath(path)), 'rb') as exitFile:
+        words = exitFile.readline().decode('utf-8', 'replace').split()
+        start = exitFile.tell()
+        exitFile.seek(0, os.SEEK_END)
+        exitFile.seek(max(start, exitFile.tell()-postmortem.tailBytes))
+        tail = exitFile.read().decode('utf-8', 'replace')
+
+    jobid = words[0] if words else None
+    try:
+        status = int(words[1]) if len(words) > 1 else None
+    except ValueError:
+        status = None
+
+    return jobid, status, tail
+
+
+def sweepRecord(path, rules):
+    with open(str(path), 'r') as recordFile:
+        record = json.load(recordFile)
+
+    if record.get('result'):
+        return
+
+    if not postmortem.exitPath(path).is_file():
+        print(str(path)+': not started')
+        return
+
+    jobid, status, tail = jobStatus(path)
+    if jobid is None:
+        print(str(path)+': not started')
+        return
+
+    if status is None:
+        # Killed before the post-mortem step could run, ask Torque
+        state, status = postmortem.queryJob(jobid)
+        if state in ['Q', 'R', 'H', 'W', 'E']:
+            print(str(path)+': running')
+            return
+        # Outputs written to $SWAP_DIR stayed on the node, only stderr is left
+        if record.get('outputDir', '$PBS_O_WORKDIR') == '$PBS_O_WORKDIR':
+            tail = postmortem.readTail(Path(record['cwd'], record['output']))
+        else:
+            tail = ''
+
+    if status == postmortem.sigterm:
+        # Walltime kill or qdel, Torque's exit_status tells them apart once
+        # the job is gone. Until then only its stderr line does.
+        state, torqueStatus = postmortem.queryJob(jobid)
+        if torqueStatus is not None:
+            status = torqueStatus
+
+    # Torque keeps stderr in $HOME/<name>.e<number> with -k oe
+    tail += postmortem.readTail(Path(os.path.expanduser('~'), Path(record['input']).name+'.e'+jobid.split('.')[0]))
+    failure = postmortem.classify(tail, status)
+    argv = None
+
+    if failure in ['normal', 'unknown']:
+        print(str(path)+': '+failure)
+    elif record['attempt'] >= record['retries']:
+        print(str(path)+': '+failure+', retry budget of '+str(record['retries'])+' used')
+    else:
+        argv, memory = postmortem.adjust(record, failure, rules)
+        if argv is None:
+            print(str(path)+': '+failure+', no rule to adjust the resources')
+        else:
+            print(str(path)+': '+failure+', resubmitting: '+' '.join(argv[1:]))
+
+    if args.nosub:
+        return
+
+    if argv:
+        if memory:
+            postmortem.setInputMemory(record, memory)
+
+        # The generator writes a new record for the next attempt and removes
+        # the .exit file. If it fails, both are put back for the next sweep.
+        with open(str(postmortem.exitPath(path)), 'rb') as exitFile:
+            exitText = exitFile.read()
+
+        if subprocess.call([sys.executable]+argv, cwd=record['cwd']) != 0:
+            print(str(path)+': resubmission failed, left for the next sweep')
+            with open(str(path), 'w') as recordFile:
+                json.dump(record, recordFile, indent=1)
+            with open(str(postmortem.exitPath(path)), 'wb') as exitFile:
+                exitFile.write(exitText)
+        return
+
+    record['result'] = failure
+    with open(str(path), 'w') as recordFile:
+        json.dump(record, recordFile, indent=1)
+
+
+def main():
+    rules = postmortem.loadRules(args.rules)
+    for path in findRecords():
+        sweepRecord(path, rules)
+
+
+main()